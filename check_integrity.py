@@ -0,0 +1,40 @@
+from sudoku import *
+import argparse, csv, time
+
+parser = argparse.ArgumentParser(description="Check in bulk that every solution in the database is a valid sudoku and agrees with the clues of its puzzle.")
+parser.add_argument("--source-data-path", default="~/sudoku.csv", help="path of the source data, the database sits in the same folder")
+parser.add_argument("--output", default="bad_rows.csv", help="csv file listing the id and the problem of each bad row")
+parser.add_argument("--chunk-size", type=int, default=100000, help="number of rows checked at once")
+
+# The first failed check names the problem of a row
+PROBLEMS = (("well_formed", "malformed"), ("valid_solution", "invalid solution"), ("clues_agree", "puzzle disagrees with solution"))
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    collection = SuDokuCollection(source_data_path=args.source_data_path)
+
+    start = time.time()
+
+    rows_checked = 0
+
+    bad_rows = 0
+
+    with open(args.output, "w", newline="") as output:
+        writer = csv.writer(output)
+        writer.writerow(["id", "problem"])
+        for chunk in pd.read_sql_query("select id, puzzle, solution from sudoku order by id", collection.connect, chunksize=args.chunk_size):
+            checks = check_integrity(chunk["puzzle"], chunk["solution"])
+            problem = np.full(len(chunk), "", dtype=object)
+            for check, name in reversed(PROBLEMS):
+                problem[~checks[check]] = name
+            bad = problem != ""
+            writer.writerows(zip(chunk["id"][bad], problem[bad]))
+            rows_checked += len(chunk)
+            bad_rows += int(bad.sum())
+            print(f"Checked {rows_checked} rows, {bad_rows} bad, {time.time() - start:.1f}s.")
+
+    print()
+
+    print(f"{bad_rows} out of {rows_checked} rows are bad, see {args.output}.")
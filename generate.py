@@ -0,0 +1,62 @@
+from sudoku import *
+from multiprocessing import Pool
+from functools import partial
+import argparse, csv
+
+parser = argparse.ArgumentParser(description="Generate new Sudoku puzzles with a unique solution.")
+parser.add_argument("count", type=int, help="number of puzzles to generate")
+parser.add_argument("--clues", type=int, default=None, help="target number of given cells (default: as few as possible on 9 x 9 boards, 45%% of the cells on larger boards)")
+parser.add_argument("--size", type=int, default=9, help="side of the boards: 9, 16, 25... (default: 9)")
+parser.add_argument("--solver-level", type=int, default=None, help="only keep the puzzles with this solver level, see rate.py")
+parser.add_argument("--csv", default=None, help="append the puzzles to this csv file, in the format read by SuDokuCollection")
+parser.add_argument("--source-data-path", default="~/sudoku.csv", help="path of the source data, the puzzles are stored in the database in the same folder unless --csv is given")
+parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+parser.add_argument("--batch-size", type=int, default=1000, help="number of puzzles written at once")
+
+
+def generate(size, target_clues, solver_level, _):
+    # A new generator for each puzzle, so that the worker processes do not share the random state they are forked with
+    return SuDokuGenerator(size=size).generate(target_clues=target_clues, solver_level=solver_level)
+
+
+def write(batch):
+    if args.csv:
+        new_file = not os.path.exists(args.csv)
+        with open(args.csv, "a", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            if new_file:
+                writer.writerow(["puzzle", "solution"])
+            writer.writerows(batch)
+    else:
+        collection.insert_puzzles(batch)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    if args.clues is None:
+        # The last clues of a large board are the slowest to remove, and the fewest to gain
+        args.clues = 0 if args.size <= 9 else int(0.45 * args.size ** 2)
+
+    collection = None if args.csv else SuDokuCollection(source_data_path=args.source_data_path)
+
+    batch = []
+
+    puzzles_generated = 0
+
+    with Pool(args.processes) as pool:
+        for puzzle in pool.imap_unordered(partial(generate, args.size, args.clues, args.solver_level), range(args.count), chunksize=10):
+            if puzzle is None:
+                continue
+            batch.append(puzzle)
+            if len(batch) == args.batch_size:
+                write(batch)
+                puzzles_generated += len(batch)
+                print(f"Generated {puzzles_generated} puzzles.")
+                batch = []
+
+    if batch:
+        write(batch)
+        puzzles_generated += len(batch)
+
+    print(f"Generated {puzzles_generated} out of {args.count} puzzles.")
@@ -0,0 +1,55 @@
+from sudoku import *
+from multiprocessing import Pool
+import argparse
+
+parser = argparse.ArgumentParser(description="Rate the puzzles in the database by the effort the SuDokuAI spends to solve them.")
+parser.add_argument("--source-data-path", default="~/sudoku.csv", help="path of the source data, the database sits in the same folder")
+parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+parser.add_argument("--batch-size", type=int, default=10000, help="number of puzzles rated and committed at once")
+
+
+def rate(row):
+    id, puzzle = row
+    return id, rate_puzzle(puzzle)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    collection = SuDokuCollection(source_data_path=args.source_data_path)
+
+    collection.initialize_rating_columns()
+
+    # Only the puzzles without a rating of the current RATING_VERSION are queried, so an interrupted run resumes where it stopped
+    # and the puzzles rated before STRATEGIES changed are rated again
+    last_id = -1
+
+    puzzles_rated = 0
+
+    with Pool(args.processes) as pool:
+        while True:
+            rows = collection.query_unrated(after_id=last_id, limit=args.batch_size)
+            if not rows:
+                break
+            collection.store_ratings(pool.map(rate, rows, chunksize=100))
+            last_id = rows[-1][0]
+            puzzles_rated += len(rows)
+            print(f"Rated {puzzles_rated} puzzles (last id {last_id}).")
+
+    print()
+
+    print("Puzzles per solver level:")
+
+    unrated = collection.query_data(f"select count(*) from sudoku where rating_version is not {RATING_VERSION}")[0][0]
+
+    if unrated:
+        print(f"unrated: {unrated}")
+
+    for solver_level, count in collection.query_data(f"select solver_level, count(*) from sudoku where rating_version = {RATING_VERSION} group by solver_level order by solver_level"):
+        if solver_level is None:
+            name = "malformed"
+        elif solver_level == len(STRATEGIES):
+            name = "stalled"
+        else:
+            name = STRATEGIES[solver_level]
+        print(f"{name}: {count}")
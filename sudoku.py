@@ -1,8 +1,11 @@
-import random, sqlite3, os
+import random, sqlite3, os, re, time
+import numpy as np
 import pandas as pd
 from colorama import Fore, Style
 from collections import Counter
-from itertools import combinations
+from functools import wraps
+from itertools import combinations, islice, product, repeat
+from multiprocessing import Pool
 
 
 class GameViolation(Exception):
@@ -12,11 +15,316 @@ class GameViolation(Exception):
     pass
 
 
+class BudgetExceeded(Exception):
+    '''
+    BudgetExceeded is raised inside the SuDokuAI when one of its budgets (time, strategy invocations or eliminations) runs out
+    '''
+    pass
+
+
+# The status returned by SuDokuAI.infer_knowledge()
+SOLVED, STALLED, BUDGET_EXCEEDED = 'solved', 'stalled', 'budget exceeded'
+
+
+# The strategies of the SuDokuAI, from the simplest to the most advanced one. This order defines the solver-effort rating of a puzzle
+STRATEGIES = ('conclude_cells', 'hidden_single', 'naked_subsets', 'hidden_subsets', 'pointing_pair', 'empty_rectangle', 'y_wings', 'x_wings',
+              'simple_coloring', 'xy_chains')
+
+# The version of the rating stored with each puzzle. It must be increased whenever STRATEGIES changes, since solver_level is an index
+# in STRATEGIES: the puzzles rated with another version are then rated again
+RATING_VERSION = 2
+
+# The columns of the `sudoku` table storing the solver-effort rating of each puzzle
+RATING_COLUMNS = {'strategies_used': 'TEXT', 'eliminations': 'INTEGER', 'stalled': 'INTEGER', 'solver_level': 'INTEGER', 'rating_version': 'INTEGER'}
+
+
+def track_strategy(strategy):
+    '''
+    Decorator for the strategies of the SuDokuAI: every candidate removed while the strategy runs is credited to it,
+    the strategies it calls in turn (e.g. hidden_single) being credited on their own
+    '''
+    @wraps(strategy)
+    def run_strategy(self, *args, **kwargs):
+        self.invocations += 1
+        self.check_budget()
+        previous_strategy, self.strategy = self.strategy, strategy.__name__
+        try:
+            return strategy(self, *args, **kwargs)
+        finally:
+            self.strategy = previous_strategy
+    return run_strategy
+
+
+def deserialize(string):
+    '''
+    Input: a string containing the numbers of an N x N sudoku (N = 9, 16, 25...) from left to right, from top to bottom, '0' being the blank space.
+           Up to 9 x 9 each number is one char (e.g. 81 chars), beyond the numbers are separated by commas (e.g. '0,12,0,3,...')
+    Output: a list of N lists whereas each inner list contains N elements, representing a sudoku row
+    '''
+    values = [int(s) for s in (string.split(',') if ',' in string else string)]
+    size = int(round(len(values) ** 0.5))
+    return [values[i:i+size] for i in range(0, len(values), size)]
+
+
+def is_well_formed(string):
+    '''
+    Input: a string, supposedly in the format read by deserialize()
+    Output: True if deserialize() reads it as an N x N sudoku (N being a square: 4, 9, 16...) whose numbers are between 0 and N, False otherwise
+    '''
+    if not isinstance(string, str):
+        return False
+    values = string.split(',') if ',' in string else string
+    size = int(round(len(values) ** 0.5))
+    block_size = int(round(size ** 0.5))
+    if size == 0 or size * size != len(values) or block_size * block_size != size:
+        return False
+    return all(value.isascii() and value.isdigit() and int(value) <= size for value in values)
+
+
+def serialize(grid):
+    '''
+    Input: a list of N lists whereas each inner list contains N elements, representing a sudoku row
+    Output: a string in the format read by deserialize()
+    '''
+    separator = ',' if len(grid) > 9 else ''
+    return separator.join(str(value) for row in grid for value in row)
+
+
+def define_difficulty(puzzle):
+    '''
+    Input: a puzzle in the format read by deserialize()
+    Output: the level of difficulty of the puzzle by its share of blank cells (47 and 39 out of 81 being the thresholds): 'Easy', 'Medium' or 'Hard'
+    '''
+    # The numbers are counted without being parsed, so that a malformed puzzle does not stop the reading of the data
+    values = puzzle.split(',') if ',' in puzzle else puzzle
+    blanks, cells = values.count('0'), len(values)
+    if blanks * 81 >= 47 * cells:
+        return 'Hard'
+    elif blanks * 81 >= 39 * cells:
+        return 'Medium'
+    else:
+        return 'Easy'
+
+
+def solutions(grid, rng=None, candidates=None, max_nodes=None):
+    '''
+    Enumerate the solutions of a puzzle with a depth-first search. The numbers used in each row, column and block are kept as bitmasks
+    and the search always branches on the blank cell with the fewest candidates
+
+    Input: grid: a list of N lists with given numbers and 0s representing blank cells
+           rng: a random.Random to try the candidates of a cell in random order, increasing order if None
+           candidates: a dict {cell: set of possible values} restricting the blank cells, e.g. SuDokuAI.knowledges
+           max_nodes: the greatest number of cells the search may fill in, no limit if None
+
+    Output: a generator of the solved grids (each of them a new list of lists). Nothing is generated if the givens violate the Game
+            Raise BudgetExceeded once the search has filled in max_nodes cells
+    '''
+    grid = [list(row) for row in grid]
+    size = len(grid)
+    block_size = int(size ** 0.5)
+    all_numbers = sum(1 << number for number in range(1, size + 1))
+    rows, columns, blocks = [0] * size, [0] * size, [0] * size
+    blanks = []
+    for row in range(size):
+        for column in range(size):
+            block = (row // block_size) * block_size + column // block_size
+            value = grid[row][column]
+            if value == 0:
+                allowed = all_numbers
+                if candidates is not None and (row, column) in candidates:
+                    allowed = sum(1 << number for number in candidates[(row, column)])
+                blanks.append((row, column, block, allowed))
+                continue
+            bit = 1 << value
+            if (rows[row] | columns[column] | blocks[block]) & bit:
+                return
+            rows[row] |= bit
+            columns[column] |= bit
+            blocks[block] |= bit
+    nodes = 0
+
+    def search(depth):
+        nonlocal nodes
+        if depth == len(blanks):
+            yield [list(row) for row in grid]
+            return
+        # Move the most constrained blank cell to position `depth`
+        best, best_candidates, best_count = depth, 0, size + 1
+        for i in range(depth, len(blanks)):
+            row, column, block, allowed = blanks[i]
+            possibles = allowed & ~(rows[row] | columns[column] | blocks[block])
+            count = bin(possibles).count('1')
+            if count < best_count:
+                best, best_candidates, best_count = i, possibles, count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            return
+        blanks[depth], blanks[best] = blanks[best], blanks[depth]
+        row, column, block, _ = blanks[depth]
+        values = [value for value in range(1, size + 1) if best_candidates >> value & 1]
+        if rng is not None:
+            rng.shuffle(values)
+        for value in values:
+            bit = 1 << value
+            rows[row] |= bit
+            columns[column] |= bit
+            blocks[block] |= bit
+            grid[row][column] = value
+            nodes += 1
+            if max_nodes is not None and nodes > max_nodes:
+                raise BudgetExceeded(f"budget of {max_nodes} search nodes exceeded")
+            yield from search(depth + 1)
+            rows[row] ^= bit
+            columns[column] ^= bit
+            blocks[block] ^= bit
+        grid[row][column] = 0
+
+    yield from search(0)
+
+
+def count_solutions(grid, limit=2, candidates=None, max_nodes=None):
+    '''
+    Count the solutions of a puzzle, stopping as soon as `limit` of them are found
+
+    Input: grid: a list of N lists with given numbers and 0s representing blank cells
+           candidates, max_nodes: see solutions()
+    Output: the number of solutions, at most `limit`. Raise BudgetExceeded if the search runs out of max_nodes
+    '''
+    return sum(1 for _ in islice(solutions(grid, candidates=candidates, max_nodes=max_nodes), limit))
+
+
+def count_puzzle_solutions(puzzle, limit=2):
+    '''
+    Count the solutions of a puzzle, the search being seeded with the candidates left by the inference of the SuDokuAI
+
+    Input: puzzle: a puzzle in the format read by deserialize()
+    Output: the number of solutions, at most `limit`. A valid puzzle has exactly 1. None if the puzzle is malformed (see is_well_formed())
+    '''
+    if not is_well_formed(puzzle):
+        return None
+    ai = SuDokuAI(deserialize(puzzle))
+    ai.conclude_cells()
+    return ai.count_solutions(limit)
+
+
+def find_subsets(masks, max_size=4):
+    '''
+    Find the groups of k items (k from 2 to max_size) whose bitmasks have exactly k bits in total, e.g. k cells of a unit sharing k candidates
+
+    Input: masks: a list of tuples (item, bitmask)
+           max_size: the greatest size of the groups
+    Output: a generator of tuples (items, union of their bitmasks), items being a tuple of k items. A group found is not extended further
+    '''
+    def search(start, items, union):
+        for i in range(start, len(masks)):
+            item, mask = masks[i]
+            group, group_union = items + (item,), union | mask
+            bits = bin(group_union).count('1')
+            # A group can only grow while its union has at most max_size bits
+            if bits > max_size:
+                continue
+            if len(group) >= 2 and bits == len(group):
+                yield group, group_union
+            elif len(group) < max_size:
+                yield from search(i + 1, group, group_union)
+
+    yield from search(0, (), 0)
+
+
+def check_integrity(puzzles, solutions):
+    '''
+    Check a batch of puzzles and solutions at once with NumPy. The rows are grouped by the size N x N of their solution,
+    each group being checked as one (rows, N x N) array
+
+    Input: puzzles: a sequence of puzzles in the format read by deserialize()
+           solutions: a sequence of solutions in the same format, one for each puzzle
+    Output: a dict of boolean arrays, one value per row:
+            well_formed: both strings have the same N x N numbers (N being a square), between 0 and N for the puzzle and between 1 and N for the solution
+            valid_solution: every row, column and block of the solution contains each number once
+            clues_agree: every given number of the puzzle is the number of the solution at the same place
+    '''
+    # A missing string (e.g. a NULL of the database) is read as an empty, thus malformed, string
+    puzzles = pd.Series(puzzles, dtype=object).to_numpy(dtype=object, na_value='')
+    solutions = pd.Series(solutions, dtype=object).to_numpy(dtype=object, na_value='')
+    rows = len(solutions)
+    well_formed, valid_solution, clues_agree = np.zeros(rows, dtype=bool), np.zeros(rows, dtype=bool), np.zeros(rows, dtype=bool)
+    if rows == 0:
+        return {'well_formed': well_formed, 'valid_solution': valid_solution, 'clues_agree': clues_agree}
+
+    def shape(strings):
+        # Whether the numbers are separated by commas, and how many numbers there are, without parsing the strings
+        commas = np.fromiter(map(str.count, strings, repeat(',')), dtype=np.int64, count=rows)
+        return commas > 0, np.where(commas > 0, commas + 1, np.fromiter(map(len, strings), dtype=np.int64, count=rows))
+
+    puzzle_comma, puzzle_cells = shape(puzzles)
+    solution_comma, solution_cells = shape(solutions)
+    sizes = np.rint(np.sqrt(solution_cells)).astype(np.int64)
+    block_sizes = np.rint(np.sqrt(sizes)).astype(np.int64)
+    # Up to 64 x 64, so that the numbers of a unit fit in the bits of an uint64
+    candidates = (puzzle_comma == solution_comma) & (puzzle_cells == solution_cells) & (sizes > 0) & (sizes <= 64) &\
+        (sizes * sizes == solution_cells) & (block_sizes * block_sizes == sizes) &\
+        np.fromiter(map(str.isascii, puzzles), dtype=bool, count=rows) & np.fromiter(map(str.isascii, solutions), dtype=bool, count=rows)
+
+    def to_array(strings, comma, cells):
+        # The strings are ASCII and have the same shape, so that they can be read as one buffer
+        if not comma:
+            return np.frombuffer(''.join(strings).encode('ascii'), dtype=np.uint8).reshape(-1, cells).astype(np.int16) - ord('0')
+        return np.array(','.join(strings).split(','), dtype=np.int64).clip(-1, 10000).astype(np.int16).reshape(-1, cells)
+
+    for comma, size in set(zip(solution_comma[candidates], sizes[candidates])):
+        group = candidates & (solution_comma == comma) & (sizes == size)
+        if comma:
+            # Every field must be a number before the strings are converted
+            numbers = r'[0-9]{1,5}(,[0-9]{1,5})*'
+            index = np.nonzero(group)[0]
+            fields = np.array([re.fullmatch(numbers, puzzles[i]) is not None and re.fullmatch(numbers, solutions[i]) is not None for i in index], dtype=bool)
+            group[index[~fields]] = False
+        index = np.nonzero(group)[0]
+        if len(index) == 0:
+            continue
+        cells = size * size
+        block_size = int(round(size ** 0.5))
+        puzzle_array = to_array(puzzles[index], comma, cells)
+        solution_array = to_array(solutions[index], comma, cells)
+        # Any char outside '0'..'9' is read as a number out of range
+        formed = ((puzzle_array >= 0) & (puzzle_array <= size)).all(axis=1) & ((solution_array >= 1) & (solution_array <= size)).all(axis=1)
+
+        # The flat indexes of the cells of the N rows, N columns and N blocks
+        cell_index = np.arange(cells).reshape(size, size)
+        blocks = cell_index.reshape(block_size, block_size, block_size, block_size).transpose(0, 2, 1, 3).reshape(size, size)
+        units = np.concatenate([cell_index, cell_index.T, blocks])
+        # A unit is valid if the bitmask of its numbers, number n being bit n - 1, has its N first bits set
+        bitmasks = np.left_shift(np.uint64(1), (np.clip(solution_array, 1, size) - 1).astype(np.uint64))
+        all_numbers = np.uint64((1 << size) - 1)
+
+        well_formed[index] = formed
+        valid_solution[index] = formed & (np.bitwise_or.reduce(bitmasks[:, units], axis=2) == all_numbers).all(axis=1)
+        clues_agree[index] = formed & ((puzzle_array == 0) | (puzzle_array == solution_array)).all(axis=1)
+    return {'well_formed': well_formed, 'valid_solution': valid_solution, 'clues_agree': clues_agree}
+
+
+def rate_puzzle(puzzle):
+    '''
+    Let the SuDokuAI solve a puzzle with the simplest strategies it needs (see SuDokuAI.escalate()) and measure how much effort it takes
+
+    Input: puzzle: a puzzle in the format read by deserialize()
+    Output: the rating of the puzzle, see SuDokuAI.rating(). None if the puzzle is malformed (see is_well_formed())
+    '''
+    if not is_well_formed(puzzle):
+        return None
+    ai = SuDokuAI(deserialize(puzzle))
+    ai.escalate()
+    return ai.rating()
+
+
 class SuDokuCollection:
     '''
     This class is to store the Sudoku puzzles and solutions to the Database
     '''
-    def __init__(self, source_data_path="~/sudoku.csv", re_read_data=False):
+    def __init__(self, source_data_path="~/sudoku.csv", re_read_data=False, validate=False):
+        # If validate is True, the puzzles without exactly one solution are rejected when the data is read
+        self.validate = validate
         # We create a database in the folder where the source data file exists
         current_dir = os.getcwd() # get the current working directory
         database_path = source_data_path[:(source_data_path.rfind("/"))]
@@ -35,18 +343,21 @@ class SuDokuCollection:
         This function reads data from a csv file and store as a attribute of the object
         CSV file has 2 columns: puzzle (the sudoku puzzle) and solution (the solution of the sudoku puzzle)
         It also adds a column to define the level of difficulty
+        If self.validate is True, the puzzles are checked in parallel and those which are malformed or do not have exactly one solution are set aside.
+        The rows keep their index, the row number in the csv file, which becomes their id in the database
 
         Modify: create a new object attribute name self.source_data. This is a DataFrame with 3 columns: puzzle, solution and level_of_difficulty
+                create a new object attribute name self.rejected_data if self.validate is True. This is a DataFrame of the rejected rows
+                with an extra column solutions (0 or 2, the search stopping at 2, or 'malformed')
         '''
-        self.source_data = pd.read_csv(self.source_data_path)
-        def define_difficulty(row):
-            if row.count('0') >= 47:
-                return 'Hard'
-            elif row.count('0') >= 39:
-                return 'Medium'
-            else:
-                return 'Easy'
+        self.source_data = pd.read_csv(self.source_data_path, dtype=str, keep_default_na=False) # as strings, to keep the leading 0s of the puzzles
         self.source_data['level_of_difficulty'] = self.source_data['puzzle'].apply(define_difficulty)
+        if self.validate:
+            with Pool() as pool:
+                solutions_count = pd.Series(pool.map(count_puzzle_solutions, self.source_data['puzzle'], chunksize=1000), index=self.source_data.index, dtype=object)
+            rejected = solutions_count != 1
+            self.rejected_data = self.source_data[rejected].assign(solutions=solutions_count[rejected].fillna('malformed'))
+            self.source_data = self.source_data[~rejected]
 
     def initialize_table(self):
         '''
@@ -92,6 +403,97 @@ class SuDokuCollection:
             return self.cursor.execute(query).fetchall()
         return random.choice(self.cursor.execute(query).fetchall())
 
+    def insert_puzzles(self, puzzles):
+        '''
+        This function appends a batch of puzzles to the table in one transaction, numbering them after the greatest id
+
+        Input: puzzles: a list of tuples (puzzle, solution), each of them a string in the format read by deserialize()
+        '''
+        self.initialize_table()
+        next_id = self.cursor.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM sudoku").fetchone()[0]
+        rows = [(next_id + i, puzzle, solution, define_difficulty(puzzle)) for i, (puzzle, solution) in enumerate(puzzles)]
+        with self.connect:
+            self.cursor.executemany("INSERT INTO sudoku (id, puzzle, solution, level_of_difficulty) VALUES (?, ?, ?, ?)", rows)
+
+    def initialize_rating_columns(self):
+        '''
+        This function adds the columns storing the solver-effort rating of each puzzle (see SuDokuAI.rating()) to the table,
+        together with their indexes. It is safe to call it on a table which already has them
+        '''
+        existing_columns = {row[1] for row in self.cursor.execute("PRAGMA table_info(sudoku)")}
+        for column, column_type in RATING_COLUMNS.items():
+            if column not in existing_columns:
+                self.cursor.execute(f"ALTER TABLE sudoku ADD COLUMN {column} {column_type}")
+        for column in ('solver_level', 'stalled', 'eliminations', 'rating_version'):
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS sudoku_{column} ON sudoku ({column})")
+        self.connect.commit()
+
+    def query_unrated(self, after_id=-1, limit=10000):
+        '''
+        This function gets the next puzzles which have not been rated yet, or have been rated with another RATING_VERSION
+
+        Input:  after_id: only the puzzles with a greater id are returned
+                limit: the maximum number of puzzles to return
+        Output: a list of tuples (id, puzzle), ordered by id
+        '''
+        query = "SELECT id, puzzle FROM sudoku WHERE rating_version IS NOT ? AND id > ? ORDER BY id LIMIT ?"
+        return self.cursor.execute(query, (RATING_VERSION, after_id, limit)).fetchall()
+
+    def store_ratings(self, ratings):
+        '''
+        This function stores the ratings of a batch of puzzles in one transaction
+
+        Input: ratings: a list of tuples (id, rating) whereas rating is the dict returned by SuDokuAI.rating(), None for a malformed puzzle
+               (see is_well_formed()) which is then marked as stalled with no solver_level, so that it is not rated again
+        '''
+        update = f"UPDATE sudoku SET {', '.join(f'{column} = ?' for column in RATING_COLUMNS)} WHERE id = ?"
+        rows = [(','.join(rating['strategies_used']), rating['eliminations'], int(rating['stalled']), rating['solver_level'], RATING_VERSION, id)
+                if rating is not None else ('', None, 1, None, RATING_VERSION, id)
+                for id, rating in ratings]
+        with self.connect:
+            self.cursor.executemany(update, rows)
+
+    def initialize_results_table(self):
+        '''
+        This function creates the table storing the outcome of each game of a test run (see test.py)
+        The structure of a row in the table: run, id, outcome ('solved', 'violation', 'not solved', 'budget exceeded' or 'malformed'), time (in seconds), strategies_used
+        '''
+        create_table = """
+            CREATE TABLE IF NOT EXISTS results (
+                run TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                time REAL NOT NULL,
+                strategies_used TEXT NOT NULL,
+                PRIMARY KEY (run, id)
+            )
+        """
+        self.cursor.execute(create_table)
+        self.connect.commit()
+
+    def store_results(self, run, results):
+        '''
+        This function stores the results of a batch of games in one transaction
+
+        Input: run: the name of the test run
+               results: a list of tuples (id, outcome, time, strategies_used) whereas strategies_used is a list of strategy names
+        '''
+        rows = [(run, id, outcome, time, ','.join(strategies_used)) for id, outcome, time, strategies_used in results]
+        with self.connect:
+            self.cursor.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+
+    def last_result_id(self, run):
+        '''
+        Output: the greatest id stored for the test run, -1 if none is stored yet
+        '''
+        return self.cursor.execute("SELECT COALESCE(MAX(id), -1) FROM results WHERE run = ?", (run,)).fetchone()[0]
+
+    def query_results(self, run, outcome):
+        '''
+        Output: the ids of the games of the test run with the outcome, ordered by id
+        '''
+        return [row[0] for row in self.cursor.execute("SELECT id FROM results WHERE run = ? AND outcome = ? ORDER BY id", (run, outcome))]
+
 
 class Board:
     '''
@@ -101,21 +503,17 @@ class Board:
         '''
         Inititalize the board
 
-        Input: receive puzzle and solution. Each of them is a string containing 81 numbers, representing a sudoku game from left to right,
-        from top to bottom. Puzzle contains '0' as the blank space. Solution contains no '0'
+        Input: receive puzzle and solution. Each of them is a string containing N x N numbers (81 for the classic 9 x 9), representing a sudoku
+        game from left to right, from top to bottom, in the format read by deserialize(). Puzzle contains 0 as the blank space. Solution contains no 0
 
-        Modify: create 2 attributes, self.puzzle and self.solution, each of which is a list of 9 lists whereas each Sudoku row is an inner list
+        Modify: create 2 attributes, self.puzzle and self.solution, each of which is a list of N lists whereas each Sudoku row is an inner list
+                create 2 attributes, self.size (N) and self.block_size (the side of a block, 3 for the classic 9 x 9)
         '''
-        def deserialize(string):
-            '''
-            Input: an 81-chars string containing number
-            Output: a list of 9 lists whereas each inner list contains 9 elements, representing a sudoku row
-            '''
-            return [[int(s) for s in string[i:i+9]] for i in range(0, len(string), 9)]
-
         self.puzzle = deserialize(puzzle)
         self.solution = deserialize(solution)
-        self.given_cells = [(row, column) for row in range(9) for column in range(9) if self.puzzle[row][column] != 0] # the cells are given at the beginning of the game
+        self.size = len(self.puzzle)
+        self.block_size = int(round(self.size ** 0.5))
+        self.given_cells = [(row, column) for row in range(self.size) for column in range(self.size) if self.puzzle[row][column] != 0] # the cells are given at the beginning of the game
     
     def is_solved(self):
         '''
@@ -135,9 +533,10 @@ class Board:
         Output: raise GameViolation Exception
         '''
         row_num, column_num = cell
+        block_row, block_column = (row_num//self.block_size)*self.block_size, (column_num//self.block_size)*self.block_size
         if value in self.puzzle[row_num] or\
             value in [r[column_num] for r in self.puzzle] or\
-            value in [self.puzzle[r][c] for r in range((row_num//3)*3, (row_num//3)*3+3) for c in range((column_num//3)*3, (column_num//3)*3+3)]:
+            value in [self.puzzle[r][c] for r in range(block_row, block_row+self.block_size) for c in range(block_column, block_column+self.block_size)]:
             raise GameViolation
     
     def print_board(self, with_color=True, puzzle=True):
@@ -153,28 +552,29 @@ class Board:
             to_print = self.puzzle
         else:
             to_print = self.solution
+        width = len(str(self.size)) # the numbers are right-aligned on the widest one
+        separator = ' '.join(['-' * width] * (self.size + self.block_size - 1))
         if with_color:
-            for row in range(9):
-                if row % 3 == 0 and row > 0:
-                    print('- - - - - - - - - - -')
-                for column in range(9):
-                    if column % 3 == 0 and column > 0:
-                        print('|', end=' ')
+            for row in range(self.size):
+                if row % self.block_size == 0 and row > 0:
+                    print(separator)
+                for column in range(self.size):
+                    if column % self.block_size == 0 and column > 0:
+                        print('|'.rjust(width), end=' ')
                     item = to_print[row][column]
-                    if item == 0:
-                        item = ' '
+                    item = str(item).rjust(width) if item != 0 else ' ' * width
                     if (row, column) in self.given_cells:
-                        print(Fore.MAGENTA + str(item) + Style.RESET_ALL, end=' ')
+                        print(Fore.MAGENTA + item + Style.RESET_ALL, end=' ')
                     else:
-                        print(Fore.GREEN + str(item) + Style.RESET_ALL, end=' ')
+                        print(Fore.GREEN + item + Style.RESET_ALL, end=' ')
                 print('\n', end='')
         else:
             i = 0
             for row in to_print:
-                if i % 3 == 0 and i > 0:
-                    print('- - - - - - - - - - -')
-                row = [str(ele) for ele in row]
-                to_be_printed = ' | '.join([' '.join(row[i:i+3]) for i in range(0, len(row), 3)]) .replace('0', ' ')
+                if i % self.block_size == 0 and i > 0:
+                    print(separator)
+                row = [str(ele).rjust(width) if ele != 0 else ' ' * width for ele in row]
+                to_be_printed = (' ' + '|'.rjust(width) + ' ').join([' '.join(row[i:i+self.block_size]) for i in range(0, len(row), self.block_size)])
                 print(to_be_printed)
                 i += 1
     
@@ -225,35 +625,72 @@ class SuDokuAI:
     '''
     This is the representation of the AI to solve the Sudoku game
     '''
-    def __init__(self, board):
+    def __init__(self, board, max_chain_length=8, time_budget=None, strategy_budget=None, elimination_budget=None):
         '''
         Initiate all necessary attributes
 
         Highlights: The SuDoKuAI only reads the board the first time to initialize the puzzle. Afterwards, it interacts with the Board
 
-        Input: board: a list of 9 lists with given numbers and 0s representing blank cells
+        Input: board: a list of N lists with given numbers and 0s representing blank cells (N = 9 for the classic Sudoku, 16, 25...)
+               max_chain_length: the greatest number of links followed by the chain strategies (simple_coloring and xy_chains)
+               time_budget: the greatest number of seconds infer_knowledge() may run, no limit if None
+               strategy_budget: the greatest number of strategy invocations (the nested ones included), no limit if None
+               elimination_budget: the greatest number of candidates removed, no limit if None
         '''
+        self.max_chain_length = max_chain_length
+        # The budgets of the solve, checked by check_budget(). The deadline is set when infer_knowledge() starts
+        self.time_budget, self.strategy_budget, self.elimination_budget = time_budget, strategy_budget, elimination_budget
+        self.deadline = None
+        self.invocations = 0
+        self.status = None
+        # The side of the board and of its blocks
+        self.size = len(board)
+        self.block_size = int(round(self.size ** 0.5))
+        # The cells of each row, column and block, and the cells sharing one of them with each cell
+        self.units = [[(row, column) for column in range(self.size)] for row in range(self.size)] +\
+            [[(row, column) for row in range(self.size)] for column in range(self.size)] +\
+            [[cell for cell in product(range(self.size), repeat=2) if self.block_of(cell) == block] for block in range(self.size)]
+        self.peers = {cell: set() for cell in product(range(self.size), repeat=2)}
+        for unit in self.units:
+            for cell in unit:
+                self.peers[cell].update(unit)
+        for cell in self.peers:
+            self.peers[cell].discard(cell)
+        # The index in self.units of the row, column and block of each cell. Rows come first, then columns, then blocks
+        self.units_of = {(row, column): (row, self.size + column, 2 * self.size + self.block_of((row, column)))
+                         for row, column in product(range(self.size), repeat=2)}
         # Contains all the possible values of each unknown cells
         self.knowledges = dict()
         # Contains all the known cells
         self.known = dict()
         # This is the cell the AI sends to the Board. When the class is instantiated, this set contains all given cells
         self.send = set()
-        # Group all the cells in the same block together
-        blocks = {(row, column): [] for row in range(0,9,3) for column in range(0,9,3)}
-        for row in range(9):
-            for column in range(9):
+        # The strategy currently running and the number of candidates each strategy has removed, to rate the effort of the solve
+        self.strategy = None
+        self.eliminations = Counter()
+        self.total_eliminations = 0
+        for row in range(self.size):
+            for column in range(self.size):
                 value = board[row][column]
                 if value == 0:
-                    self.knowledges[(row, column)] = set(range(1, 10))
-                    for block in blocks:
-                        if self.is_same_block(((row, column), block)):
-                            blocks[block].append((row, column))
+                    self.knowledges[(row, column)] = set(range(1, self.size + 1))
                 else:
                     self.known[(row, column)] = value
                     self.send.add((row, column))
-        
-        self.blocks = [set(block) for block in blocks.values()] # a list of sets, each set represents a block
+        # The dual of self.knowledges: the unknown cells where each number can still be in each unit, {(unit index, number): set of cells}
+        # It is kept up to date by remove_numbers() and conclude_cell()
+        self.positions = {(unit, number): set() for unit in range(len(self.units)) for number in range(1, self.size + 1)}
+        for cell, values in self.knowledges.items():
+            for unit in self.units_of[cell]:
+                for value in values:
+                    self.positions[(unit, value)].add(cell)
+        # The graph of strong links used by the chain strategies, kept up to date by remove_numbers() and conclude_cell():
+        # a number with only two positions in a unit, {(unit index, number): (cell, cell)}, and the cells with only two candidates.
+        # The weak links are the peers sharing a candidate, read from self.peers and self.knowledges
+        self.strong_links = dict()
+        for unit, number in self.positions:
+            self.update_strong_link(unit, number)
+        self.bivalue_cells = {cell for cell, values in self.knowledges.items() if len(values) == 2}
 
     def fill(self):
         '''
@@ -296,9 +733,48 @@ class SuDokuAI:
         Modify: itself with fewer values in the possible set of a particular cell
         '''
         if reverse:
+            removed = self.knowledges[cell].difference(numbers)
             self.knowledges[cell] = numbers
         else:
+            removed = self.knowledges[cell].intersection(numbers)
             self.knowledges[cell] = self.knowledges[cell].difference(numbers)
+        for unit in self.units_of[cell]:
+            for number in removed:
+                self.positions[(unit, number)].discard(cell)
+                self.update_strong_link(unit, number)
+        if len(self.knowledges[cell]) == 2:
+            self.bivalue_cells.add(cell)
+        else:
+            self.bivalue_cells.discard(cell)
+        self.eliminations[self.strategy] += len(removed)
+        self.total_eliminations += len(removed)
+        self.check_budget()
+
+    def conclude_cell(self, cell):
+        '''
+        This function moves a cell with only one possible value from the knowledge base to self.known
+
+        Input: a cell: tuple
+        '''
+        value = self.knowledges.pop(cell).pop()
+        self.known[cell] = value
+        for unit in self.units_of[cell]:
+            self.positions[(unit, value)].discard(cell)
+            self.update_strong_link(unit, value)
+        self.bivalue_cells.discard(cell)
+
+    def update_strong_link(self, unit, number):
+        '''
+        This function records whether the number has a strong link in the unit, i.e. exactly two positions
+
+        Input: unit: an index in self.units
+               number: a number
+        '''
+        cells = self.positions[(unit, number)]
+        if len(cells) == 2:
+            self.strong_links[(unit, number)] = tuple(cells)
+        else:
+            self.strong_links.pop((unit, number), None)
     
     def infer_knowledge(self):
         '''
@@ -310,20 +786,108 @@ class SuDokuAI:
 
         There is one loop with a tracker varibale `times`. This loop is to ensure that all the high-level strategies can
         interact with each other to solve the game at least once.
+
+        If a budget runs out (see __init__), the inference stops and the cells concluded so far are kept, to be sent by fill()
+
+        Output: the status of the solve, also stored in self.status: SOLVED, STALLED (some cells cannot be inferred) or BUDGET_EXCEEDED
         '''
-        self.conclude_cells()
-        times = 0
-        while times <= 1:
-            self.hidden_single()
-            if len(self.knowledges) == 0:
-                break
-            self.naked_pair()
-            self.pointing_pair()
-            self.empty_rectangle()
-            self.y_wings()
-            self.x_wings()
-            times += 1
+        if self.time_budget is not None:
+            self.deadline = time.monotonic() + self.time_budget
+        try:
+            self.conclude_cells()
+            times = 0
+            while times <= 1:
+                self.hidden_single()
+                if len(self.knowledges) == 0:
+                    break
+                self.naked_subsets()
+                self.hidden_subsets()
+                self.pointing_pair()
+                self.empty_rectangle()
+                self.y_wings()
+                self.x_wings()
+                self.simple_coloring()
+                self.xy_chains()
+                times += 1
+        except BudgetExceeded:
+            self.status = BUDGET_EXCEEDED
+        else:
+            self.status = SOLVED if len(self.knowledges) == 0 else STALLED
+        return self.status
 
+    def escalate(self):
+        '''
+        This function solves the game with the simplest strategies it needs, to rate the effort of the solve (see rating()).
+
+        The strategies are tried in the order of STRATEGIES: a strategy only runs once all the simpler ones make no more progress,
+        and the simplest one runs again after any progress. A strategy is thus only credited with eliminations the simpler ones cannot make
+
+        Output: the status of the solve, also stored in self.status, see infer_knowledge()
+        '''
+        if self.time_budget is not None:
+            self.deadline = time.monotonic() + self.time_budget
+        try:
+            level = 0
+            while len(self.knowledges) > 0 and level < len(STRATEGIES):
+                progress = len(self.knowledges), self.total_eliminations
+                getattr(self, STRATEGIES[level])()
+                level = 0 if (len(self.knowledges), self.total_eliminations) != progress else level + 1
+        except BudgetExceeded:
+            self.status = BUDGET_EXCEEDED
+        else:
+            self.status = SOLVED if len(self.knowledges) == 0 else STALLED
+        return self.status
+
+    def check_budget(self):
+        '''
+        This function is called between and inside the strategies to stop the inference once a budget runs out
+
+        Output: raise BudgetExceeded Exception
+        '''
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded(f"time budget of {self.time_budget} seconds exceeded")
+        if self.strategy_budget is not None and self.invocations > self.strategy_budget:
+            raise BudgetExceeded(f"budget of {self.strategy_budget} strategy invocations exceeded")
+        if self.elimination_budget is not None and self.total_eliminations > self.elimination_budget:
+            raise BudgetExceeded(f"budget of {self.elimination_budget} eliminations exceeded")
+
+    def count_solutions(self, limit=2, max_nodes=None):
+        '''
+        This function counts the solutions of the puzzle which agree with the current knowledge, by a search on the candidates left.
+        The more the knowledge has been reduced (e.g. by conclude_cells() or infer_knowledge()), the smaller the search
+
+        Input: max_nodes: see solutions()
+        Output: the number of solutions, at most `limit`. Raise BudgetExceeded if the search runs out of max_nodes
+        '''
+        grid = [[self.known.get((row, column), 0) for column in range(self.size)] for row in range(self.size)]
+        return count_solutions(grid, limit, candidates=self.knowledges, max_nodes=max_nodes)
+
+    def rating(self):
+        '''
+        This function measures the effort the AI has spent on the puzzle so far, usually called after escalate() or infer_knowledge()
+
+        Output: a dict with
+                strategies_used: the strategies which removed at least one candidate, from the simplest to the most advanced one
+                eliminations: the total number of candidates removed
+                stalled: True if some cells could not be inferred
+                solver_level: the index in STRATEGIES of the most advanced strategy used, len(STRATEGIES) if the AI stalled
+        '''
+        strategies_used = [strategy for strategy in STRATEGIES if self.eliminations[strategy] > 0]
+        stalled = len(self.knowledges) > 0
+        if stalled:
+            solver_level = len(STRATEGIES)
+        elif strategies_used:
+            solver_level = STRATEGIES.index(strategies_used[-1])
+        else:
+            solver_level = 0
+        return {
+            'strategies_used': strategies_used,
+            'eliminations': sum(self.eliminations.values()),
+            'stalled': stalled,
+            'solver_level': solver_level,
+        }
+
+    @track_strategy
     def conclude_cells(self):
         '''
         Remove all invalid numbers from the knowledge base based on inference process.
@@ -334,101 +898,87 @@ class SuDokuAI:
             if bfr_infer == aftr_infer:
                 break
             bfr_infer = len(self.knowledges)
-            # First, remove invalid numbers from the knowledge base
-            for knowledge in self.knowledges:
-                known_values = set(
-                        [self.known[cell] for cell in self.known if \
-                        self.is_same_row((cell, knowledge)) or\
-                        self.is_same_column((cell, knowledge)) or\
-                        self.is_same_block((cell, knowledge))]
-                    )
-                self.remove_numbers(knowledge, known_values)
+            # First, remove invalid numbers from the knowledge base: each known value is removed from the cells where it is still possible
+            # in the row, column and block of the known cell
+            for cell, value in self.known.items():
+                for unit in self.units_of[cell]:
+                    for knowledge in list(self.positions[(unit, value)]):
+                        self.remove_numbers(knowledge, set([value]))
             # Then, check whether we can conclude any cells
             cells = list(self.knowledges.keys())
             for cell in cells:
                 if self.known_cell(self.knowledges[cell]):
-                    value = self.knowledges.pop(cell).pop()
-                    self.known[cell] = value
+                    self.conclude_cell(cell)
             aftr_infer = len(self.knowledges)
 
+    @track_strategy
     def hidden_single(self):
         '''
         If one of the candidates within a cell is the only candidate in a row, column or block, that candidate is the solution of the cell.
         '''
         if len(self.knowledges) == 0:
             return
-        # Row and Column
-        for row_or_column in [0, 1]:
-            lines = set([cell[row_or_column] for cell in self.knowledges.keys()])
-            for line in lines:
-                cells_in_check = {key: value for key, value in self.knowledges.items() if key[row_or_column] == line}
-                possibles = [possible for cell in cells_in_check for possible in cells_in_check[cell]]
-                unique_values = [pair[0] for pair in Counter(possibles).most_common() if pair[1] == 1]
-                for unique_value in unique_values:
-                    cell = [cell for cell in cells_in_check if unique_value in cells_in_check[cell]][0]
-                    self.remove_numbers(cell, set([unique_value]), reverse=True)
+        # Rows, then columns, then blocks
+        for kind in range(3):
+            for unit in range(kind * self.size, (kind + 1) * self.size):
+                for number in range(1, self.size + 1):
+                    if len(self.positions[(unit, number)]) == 1:
+                        cell = next(iter(self.positions[(unit, number)]))
+                        self.remove_numbers(cell, set([number]), reverse=True)
             self.conclude_cells()
 
-        # Block
-        blocks = dict()
-        for row in range(0, 9, 3):
-            for column in range(0, 9, 3):
-                for cell in self.knowledges:
-                    if self.is_same_block((cell, (row, column))):
-                        if (row, column) not in blocks:
-                            blocks[(row, column)] = []
-                        blocks[(row, column)].append(cell)
-        for block in blocks:
-            cells_in_check = {key: value for key, value in self.knowledges.items() if key in blocks[block]}
-            possibles = [possible for cell in cells_in_check for possible in cells_in_check[cell]]
-            unique_values = [pair[0] for pair in Counter(possibles).most_common() if pair[1] == 1]
-            for unique_value in unique_values:
-                cell = [cell for cell in cells_in_check if unique_value in cells_in_check[cell]][0]
-                self.remove_numbers(cell, set([unique_value]), reverse=True)
-        self.conclude_cells()
-
-    def naked_pair(self):
-        '''
-        If a pair of candidates exist in two cells within the same row, column or block, the pair of candidates are the solutions to those
-        two cells and all other cells can eliminate this pair of candidates
+    @track_strategy
+    def naked_subsets(self):
+        '''
+        If the candidates of k cells (k from 2 to 4) within the same row, column or block are k numbers in total, these numbers are the solutions
+        to those k cells and all other cells of the unit can eliminate them (naked pairs, triples and quads)
+
+        The candidates of each cell are a bitmask and the cells are combined as long as the union of their bitmasks has at most k numbers.
+        The eliminations found in all units are applied at once
         '''
         if len(self.knowledges) == 0:
             return
-        def run_naked_pair(pair, possible_set):
-            '''
-            Execute the elimination of the naked pair
-            Input: pair: the naked pair
-                    possible_set: the values to be removed from the pair
-            '''
-            cell_1, cell_2 = pair
-            # Row
-            if self.is_same_row((cell_1, cell_2)):
-                for cell in set(self.knowledges.keys()).difference(set(pair)):
-                    if self.is_same_row((cell, cell_1)):
-                        self.remove_numbers(cell, set(possible_set))
-            # Column
-            elif self.is_same_column((cell_1, cell_2)):
-                for cell in set(self.knowledges.keys()).difference(set(pair)):
-                    if self.is_same_column((cell, cell_1)):
-                        self.remove_numbers(cell, set(possible_set))
-            # Block
-            if self.is_same_block((cell_1, cell_2)):
-                for cell in set(self.knowledges.keys()).difference(set(pair)):
-                    if self.is_same_block((cell, cell_1)):
-                        self.remove_numbers(cell, set(possible_set))
-        
-        # Get all the cells with 2 possible values
-        two_values_cells = {key: value for key, value in self.knowledges.items() if len(value) == 2}
-        possible_sets = set([tuple(sorted(list(value))) for value in two_values_cells.values()])
-        for possible_set in possible_sets:
-            cells = [key for key in two_values_cells.keys() if two_values_cells[key] == set(possible_set)]
-            if len(cells) > 2:
-                for pair in list(combinations(cells, 2)):
-                    run_naked_pair(pair, possible_set)
-            elif len(cells) == 2:
-                run_naked_pair(cells, possible_set)
+        eliminations = dict()
+        for unit in self.units:
+            self.check_budget()
+            cells = [cell for cell in unit if cell in self.knowledges]
+            masks = [(cell, sum(1 << value for value in self.knowledges[cell])) for cell in cells]
+            max_size = min(4, len(cells) - 1)
+            for subset, union in find_subsets([(cell, mask) for cell, mask in masks if 2 <= bin(mask).count('1') <= max_size], max_size):
+                for cell, mask in masks:
+                    if cell not in subset and mask & union:
+                        eliminations[cell] = eliminations.get(cell, 0) | (mask & union)
+        for cell, mask in eliminations.items():
+            self.remove_numbers(cell, {value for value in range(1, self.size + 1) if mask >> value & 1})
+        self.hidden_single()
+
+    @track_strategy
+    def hidden_subsets(self):
+        '''
+        If k numbers (k from 2 to 4) can only be in the same k cells within a row, column or block, these numbers are the solutions to those
+        k cells and the cells can eliminate all their other candidates (hidden pairs, triples and quads)
+
+        The positions of each number within the unit (see self.positions) are a bitmask and the numbers are combined as long as the union of
+        their bitmasks has at most k cells. The eliminations found in all units are applied at once
+        '''
+        if len(self.knowledges) == 0:
+            return
+        eliminations = dict()
+        for unit, unit_cells in enumerate(self.units):
+            self.check_budget()
+            cells = [cell for cell in unit_cells if cell in self.knowledges]
+            bits = {cell: 1 << i for i, cell in enumerate(cells)}
+            masks = [(number, sum(bits[cell] for cell in self.positions[(unit, number)])) for number in range(1, self.size + 1)]
+            max_size = min(4, len(cells) - 1)
+            for numbers, union in find_subsets([(number, mask) for number, mask in masks if 2 <= bin(mask).count('1') <= max_size], max_size):
+                for cell in cells:
+                    if bits[cell] & union:
+                        eliminations.setdefault(cell, set()).update(self.knowledges[cell].difference(numbers))
+        for cell, numbers in eliminations.items():
+            self.remove_numbers(cell, numbers)
         self.hidden_single()
 
+    @track_strategy
     def pointing_pair(self):
         '''
         A candidate appears only in two (or three) cells in a block and those cells are in the same row or column, then all appearances of that
@@ -436,29 +986,24 @@ class SuDokuAI:
         '''
         if len(self.knowledges) == 0:
             return
-        for block in self.blocks:
-            cells_in_block = {cell: value for cell, value in self.knowledges.items() if cell in block}
-            if len(cells_in_block) <= 1:
+        for block in range(2 * self.size, 3 * self.size):
+            if len([cell for cell in self.units[block] if cell in self.knowledges]) <= 1:
                 continue
-            candidates = dict()
-            for cell, values in cells_in_block.items():
-                for value in values:
-                    if value not in candidates:
-                        candidates[value] = set()
-                    candidates[value].add(cell)
-            for candidate in candidates:
-                if self.is_same_row(candidates[candidate]):
-                    row = list(candidates[candidate])[0][0]
-                    for knowledge in set(self.knowledges.keys()).difference(set(cells_in_block)):
-                        if knowledge[0] == row and candidate in self.knowledges[knowledge]:
-                            self.remove_numbers(knowledge, set([candidate]))
-                elif self.is_same_column(candidates[candidate]):
-                    column = list(candidates[candidate])[0][1]
-                    for knowledge in set(self.knowledges.keys()).difference(set(cells_in_block)):
-                        if knowledge[1] == column and candidate in self.knowledges[knowledge]:
-                            self.remove_numbers(knowledge, set([candidate]))
+            for candidate in range(1, self.size + 1):
+                cells = self.positions[(block, candidate)]
+                if not cells:
+                    continue
+                if self.is_same_row(cells):
+                    line = self.units_of[next(iter(cells))][0]
+                elif self.is_same_column(cells):
+                    line = self.units_of[next(iter(cells))][1]
+                else:
+                    continue
+                for knowledge in self.positions[(line, candidate)].difference(cells):
+                    self.remove_numbers(knowledge, set([candidate]))
             self.hidden_single()
 
+    @track_strategy
     def empty_rectangle(self):
         '''
         An Empty Rectangle as a rectangle that is inside a Square and the corners of which do not contain a particular Candidate.
@@ -478,10 +1023,11 @@ class SuDokuAI:
                     to_lookup, inverse_lookup = 1, 0
                 else:
                     to_lookup, inverse_lookup = 0, 1
-                cells_to_check = {cell for cell in self.knowledges if (not self.is_same_block((cell, cell_to_follow))) and cell[to_lookup] == cell_to_follow[to_lookup] and candidate in self.knowledges[cell]}
-                blocks = {tuple(block.intersection(set(self.knowledges.keys()))) for cell in cells_to_check for block in self.blocks if cell in block}
+                perpendicular_line = self.units_of[cell_to_follow][to_lookup]
+                cells_to_check = {cell for cell in self.positions[(perpendicular_line, candidate)] if not self.is_same_block((cell, cell_to_follow))}
+                blocks = {self.units_of[cell][2] for cell in cells_to_check}
                 for block in blocks:
-                    cells_with_candidate = {cell for cell in block if candidate in self.knowledges[cell]}
+                    cells_with_candidate = self.positions[(block, candidate)]
                     aligned_cells = {cell for cell in cells_with_candidate if cell[to_lookup] == cell_to_follow[to_lookup]}
                     un_aligned_cells = cells_with_candidate.difference(aligned_cells)
                     if len({cell[inverse_lookup] for cell in un_aligned_cells}) == 1:
@@ -489,12 +1035,11 @@ class SuDokuAI:
             return to_return
         
         for row_or_column in [0, 1]:
-            for line in {cell[row_or_column] for cell in self.knowledges}:
-                cells_in_line = {cell: value for cell, value in self.knowledges.items() if cell[row_or_column] == line}
-                candidates_in_check = [value[0] for value in Counter([possible for cell in cells_in_line for possible in cells_in_line[cell]]).most_common() if value[1] == 2]
-                for candidate in candidates_in_check:
-                    pair = {cell for cell in cells_in_line if candidate in cells_in_line[cell]}
-                    if not self.is_same_block(tuple(pair)):
+            for line in range(row_or_column * self.size, (row_or_column + 1) * self.size):
+                self.check_budget()
+                for candidate in range(1, self.size + 1):
+                    pair = tuple(self.positions[(line, candidate)]) # a strong link if the candidate has exactly 2 positions in the line
+                    if len(pair) == 2 and not self.is_same_block(pair):
                         directions = lookup_empty_rectangle(row_or_column, candidate, *pair)
                         for direction in directions:
                             row, column = direction if row_or_column == 0 else direction[::-1]
@@ -502,6 +1047,7 @@ class SuDokuAI:
                                 self.remove_numbers((row, column), set([candidate]))
             self.hidden_single()
 
+    @track_strategy
     def x_wings(self):
         '''
         If a candidate appears in four cells forming a rectangle and it appears only in 2 cells of each row then all other appearances of the candidate
@@ -511,24 +1057,27 @@ class SuDokuAI:
             return
 
         for line, line_perpen in [(0, 1), (1, 0)]:
-            for align in {cell[line] for cell in self.knowledges}:
-                all_values = [value for cell in self.knowledges if cell[line] == align for value in self.knowledges[cell]]
-                candidates = [value[0] for value in Counter(all_values).most_common() if value[1] == 2]
-                for candidate in candidates:
-                    all_cells_with_candidates = {cell: value for cell, value in self.knowledges.items() if candidate in self.knowledges[cell]}
-                    cells_with_candidates = [cell for cell in all_cells_with_candidates if cell[line] == align]
-                    aligned_perpens = {cell[line_perpen] for cell in cells_with_candidates}
-                    all_aligned_cells = {cell for cell in self.knowledges if cell[line_perpen] in aligned_perpens and candidate in self.knowledges[cell] and not self.is_same_block((cell, *cells_with_candidates), any_pair=True)}
-                    aligns_of_aligned_cells = {counter[0] for counter in Counter([cell[line] for cell in all_aligned_cells]).most_common() if counter[1] == 2}
+            for align in range(line * self.size, (line + 1) * self.size):
+                self.check_budget()
+                for candidate in range(1, self.size + 1):
+                    cells_with_candidates = list(self.positions[(align, candidate)])
+                    if len(cells_with_candidates) != 2:
+                        continue
+                    aligned_perpens = {self.units_of[cell][line_perpen] for cell in cells_with_candidates}
+                    all_aligned_cells = {cell for perpen in aligned_perpens for cell in self.positions[(perpen, candidate)]
+                                         if not self.is_same_block((cell, *cells_with_candidates), any_pair=True)}
+                    aligns_of_aligned_cells = {counter[0] for counter in Counter([self.units_of[cell][line] for cell in all_aligned_cells]).most_common() if counter[1] == 2}
                     for align_of_aligned_cells in aligns_of_aligned_cells:
-                        if len([cell for cell in all_cells_with_candidates if cell[line] == align_of_aligned_cells and candidate in all_cells_with_candidates[cell] and cell not in cells_with_candidates]) != 2:
+                        # The candidate must have no other position in that line
+                        aligned_cells = set(self.positions[(align_of_aligned_cells, candidate)])
+                        if len(aligned_cells) != 2 or not aligned_cells.issubset(all_aligned_cells):
                             continue
-                        aligned_cells = {cell for cell in all_aligned_cells if cell[line] == align_of_aligned_cells}
-                        cells_to_remove_candidates = {cell for cell in self.knowledges if cell[line_perpen] in aligned_perpens and candidate in self.knowledges[cell] and cell not in cells_with_candidates and cell not in aligned_cells}
+                        cells_to_remove_candidates = {cell for perpen in aligned_perpens for cell in self.positions[(perpen, candidate)]}.difference(cells_with_candidates, aligned_cells)
                         for cell_to_remove_candidate in cells_to_remove_candidates:
                             self.remove_numbers(cell_to_remove_candidate, {candidate})
             self.hidden_single()
 
+    @track_strategy
     def y_wings(self):
         '''
         Find a cell with exactly two candidates. We'll call this cell a pivot.
@@ -539,32 +1088,103 @@ class SuDokuAI:
         if len(self.knowledges) == 0:
             return
 
-        def find_pivot(cell_1, cell_2, cell_3):
-            pivot, wings = None, None
-            if self.is_peer((cell_1, cell_2)) and self.is_peer((cell_1, cell_3)) and not self.is_peer((cell_2, cell_3)):
-                pivot, wings = cell_1, (cell_2, cell_3)
-            elif self.is_peer((cell_2, cell_1)) and self.is_peer((cell_2, cell_3)) and not self.is_peer((cell_1, cell_3)):
-                pivot, wings = cell_2, (cell_1, cell_3)
-            elif self.is_peer((cell_3, cell_1)) and self.is_peer((cell_3, cell_2)) and not self.is_peer((cell_1, cell_2)):
-                pivot, wings = cell_3, (cell_1, cell_2)
-            return pivot, wings
-
+        # Each two-candidate cell is tried as the pivot, the pincers being searched among its peers only
         two_value_cells = {cell: values for cell, values in self.knowledges.items() if len(values) == 2}
-        groups = [group for group in combinations(two_value_cells.keys(), 3) if not (self.is_same_block(group) or self.is_same_row(group) or self.is_same_column(group))]
-        for group in groups:
-            if len({tuple(sorted(list(two_value_cells[cell]))) for cell in group}) != 3 or len({value for cell in group for value in two_value_cells[cell]}) != 3:
-                continue
-            pivot, wings = find_pivot(*group)
-            if not pivot:
-                continue
-            wings_value = two_value_cells[wings[0]].intersection(two_value_cells[wings[1]])
-            if len(wings_value) != 1:
-                continue
-            for cell in self.knowledges:
-                if cell in group:
+        for pivot, pivot_values in two_value_cells.items():
+            self.check_budget()
+            pincers = [cell for cell in self.peers[pivot] if cell in two_value_cells and len(two_value_cells[cell].intersection(pivot_values)) == 1]
+            for wings in combinations(pincers, 2):
+                if two_value_cells[wings[0]] == two_value_cells[wings[1]] or self.is_peer(wings):
+                    continue
+                if len(pivot_values.union(*[two_value_cells[wing] for wing in wings])) != 3:
                     continue
-                if list(wings_value)[0] in self.knowledges[cell] and self.is_peer((cell, wings[0])) and self.is_peer((cell, wings[1])):
-                    self.remove_numbers(cell, wings_value)
+                wings_value = two_value_cells[wings[0]].intersection(two_value_cells[wings[1]])
+                for cell in self.peers[wings[0]].intersection(self.peers[wings[1]]):
+                    if cell != pivot and cell in self.knowledges and list(wings_value)[0] in self.knowledges[cell]:
+                        self.remove_numbers(cell, wings_value)
+        self.hidden_single()
+
+    @track_strategy
+    def simple_coloring(self):
+        '''
+        For each candidate, the cells linked by strong links (the only two positions of the candidate in a row, column or block) form chains
+        whose cells alternate between two colors: either all cells of one color or all cells of the other color are the solution.
+        If two cells of the same color are in the same row, column or block, that color is wrong and the candidate is eliminated from its cells.
+        A cell seeing both colors can eliminate the candidate. The chains are followed up to self.max_chain_length links from their first cell
+        '''
+        if len(self.knowledges) == 0:
+            return
+        for candidate in range(1, self.size + 1):
+            self.check_budget()
+            graph = dict()
+            for (unit, number), (cell_1, cell_2) in self.strong_links.items():
+                if number == candidate:
+                    graph.setdefault(cell_1, set()).add(cell_2)
+                    graph.setdefault(cell_2, set()).add(cell_1)
+            colored = set()
+            for root in list(graph):
+                if root in colored or root not in self.knowledges or candidate not in self.knowledges[root]:
+                    continue
+                # Color the chain breadth-first from its first cell
+                colors, frontier = ({root}, set()), [root]
+                for depth in range(1, self.max_chain_length + 1):
+                    next_frontier = []
+                    for cell in frontier:
+                        for linked_cell in graph[cell]:
+                            if linked_cell not in colors[0] and linked_cell not in colors[1]:
+                                colors[depth % 2].add(linked_cell)
+                                next_frontier.append(linked_cell)
+                    frontier = next_frontier
+                colored.update(*colors)
+                if len(colors[1]) == 0:
+                    continue
+                wrong_colors = [color for color in colors if any(self.peers[cell].intersection(color) for cell in color)]
+                if len(wrong_colors) == 1:
+                    for cell in wrong_colors[0]:
+                        self.remove_numbers(cell, set([candidate]))
+                elif len(wrong_colors) == 0:
+                    seen = [set().union(*[self.peers[cell] for cell in color]) for color in colors]
+                    for cell in seen[0].intersection(seen[1]).difference(*colors):
+                        if cell in self.knowledges and candidate in self.knowledges[cell]:
+                            self.remove_numbers(cell, set([candidate]))
+        self.hidden_single()
+
+    @track_strategy
+    def xy_chains(self):
+        '''
+        An XY-Chain is a chain of cells with two candidates each, every cell seeing the next one and sharing a candidate with it. If the first cell
+        is not X then its other candidate forces the next cell, and so on: if the last cell is then forced to X, either the first or the last cell
+        is X, and X is eliminated from every cell seeing both of them. The chains are followed up to self.max_chain_length cells
+        '''
+        if len(self.knowledges) == 0:
+            return
+        for start in list(self.bivalue_cells):
+            self.check_budget()
+            if start not in self.bivalue_cells:
+                continue
+            for candidate in list(self.knowledges[start]):
+                if start not in self.bivalue_cells:
+                    break
+                # The states of the chain are (cell, number forced in the cell if the start is not the candidate)
+                forced = self.knowledges[start].difference([candidate]).pop()
+                visited, frontier, ends = {(start, forced)}, [(start, forced)], set()
+                for _ in range(self.max_chain_length - 1):
+                    next_frontier = []
+                    for cell, number in frontier:
+                        for next_cell in self.peers[cell].intersection(self.bivalue_cells):
+                            if number not in self.knowledges[next_cell]:
+                                continue
+                            state = (next_cell, self.knowledges[next_cell].difference([number]).pop())
+                            if state not in visited:
+                                visited.add(state)
+                                next_frontier.append(state)
+                                if state[1] == candidate and next_cell != start:
+                                    ends.add(next_cell)
+                    frontier = next_frontier
+                for end in ends:
+                    for cell in self.peers[start].intersection(self.peers[end]):
+                        if cell != end and cell in self.knowledges and candidate in self.knowledges[cell]:
+                            self.remove_numbers(cell, set([candidate]))
         self.hidden_single()
 
     def is_same_row(self, cells, any_pair=False):
@@ -574,10 +1194,90 @@ class SuDokuAI:
         return len(set([cell[1] for cell in cells])) == 1
 
     def is_same_block(self, cells, any_pair=False):
-        row, column = cells[0]
+        block = self.block_of(cells[0])
         if any_pair:
-            return any([cell[0] in range((row//3)*3, (row//3)*3+3) and cell[1] in range((column//3)*3, (column//3)*3+3) for cell in cells[1:]])
-        return all([cell[0] in range((row//3)*3, (row//3)*3+3) and cell[1] in range((column//3)*3, (column//3)*3+3) for cell in cells[1:]])
+            return any([self.block_of(cell) == block for cell in cells[1:]])
+        return all([self.block_of(cell) == block for cell in cells[1:]])
+
+    def block_of(self, cell):
+        '''
+        Output: the index of the block of the cell, from 0 (top left) to N - 1 (bottom right)
+        '''
+        row, column = cell
+        return (row // self.block_size) * self.block_size + column // self.block_size
     
     def is_peer(self, cells, any_pair=False):
         return self.is_same_row(cells, any_pair) or self.is_same_column(cells, any_pair) or self.is_same_block(cells, any_pair)
+
+
+class SuDokuGenerator:
+    '''
+    This is the generator of new Sudoku puzzles with a unique solution
+    '''
+    def __init__(self, seed=None, size=9, max_nodes=2000):
+        '''
+        Input: seed: the seed of the random generator, a random seed if None
+               size: the side N of the boards generated (9, 16, 25...)
+               max_nodes: the budget of the search checking that a removal keeps the solution unique, see solutions().
+               A removal whose check runs out of it is skipped, which keeps the generation of large boards fast
+        '''
+        self.random = random.Random(seed)
+        self.size = size
+        self.max_nodes = max_nodes
+
+    def complete_grid(self):
+        '''
+        Output: a random solved grid, a list of N lists
+        '''
+        return next(solutions([[0] * self.size for _ in range(self.size)], rng=self.random))
+
+    def remove_clues(self, solution, target_clues=0):
+        '''
+        Remove the numbers of a solved grid one by one in random order, keeping only the removals after which the puzzle still has
+        a unique solution. Beyond 9 x 9, each check is a search seeded with the candidates left by SuDokuAI.conclude_cells()
+
+        Input: solution: a solved grid, a list of N lists
+               target_clues: stop once the puzzle has this number of given cells. The puzzle may end with more clues if
+               no further number can be removed
+
+        Output: the puzzle, a list of N lists with 0s representing blank cells
+        '''
+        puzzle = [list(row) for row in solution]
+        cells = [(row, column) for row in range(self.size) for column in range(self.size)]
+        self.random.shuffle(cells)
+        clues = len(cells)
+        for row, column in cells:
+            if clues <= target_clues:
+                break
+            value, puzzle[row][column] = puzzle[row][column], 0
+            try:
+                if self.size > 9:
+                    ai = SuDokuAI(puzzle)
+                    ai.conclude_cells()
+                    unique = ai.count_solutions(limit=2, max_nodes=self.max_nodes) == 1
+                else:
+                    unique = count_solutions(puzzle, limit=2, max_nodes=self.max_nodes) == 1
+            except BudgetExceeded:
+                unique = False
+            if unique:
+                clues -= 1
+            else:
+                puzzle[row][column] = value
+        return puzzle
+
+    def generate(self, target_clues=0, solver_level=None, attempts=100):
+        '''
+        Generate a puzzle with a unique solution
+
+        Input: target_clues: the number of given cells to reach, see remove_clues()
+               solver_level: if not None, only a puzzle with this solver_level (see SuDokuAI.rating()) is accepted
+               attempts: the number of puzzles to try to get the solver_level
+
+        Output: a tuple (puzzle, solution) of strings in the format read by deserialize(), None if no puzzle of the solver_level is found
+        '''
+        for _ in range(attempts):
+            solution = self.complete_grid()
+            puzzle = serialize(self.remove_clues(solution, target_clues))
+            if solver_level is None or rate_puzzle(puzzle)['solver_level'] == solver_level:
+                return puzzle, serialize(solution)
+        return None
@@ -1,55 +1,95 @@
 from sudoku import *
-import sys
+import sys, time, argparse
 
-games = SuDokuCollection().query_data(f"select id, puzzle, solution from sudoku", get_all=True)
+parser = argparse.ArgumentParser(description="Let the AI solve every game in the database and store the outcome of each of them.")
+parser.add_argument("--run", default="default", help="name of the test run, an interrupted run resumes when started again with the same name")
+parser.add_argument("--source-data-path", default="~/sudoku.csv", help="path of the source data, the database sits in the same folder")
+parser.add_argument("--batch-size", type=int, default=10000, help="number of games whose results are committed at once")
+parser.add_argument("--time-budget", type=float, default=None, help="seconds the AI may spend inferring each game, the game is then recorded as 'budget exceeded'")
 
-total_games = len(games)
+args = parser.parse_args()
 
-games_solved = 0
+collection = SuDokuCollection(source_data_path=args.source_data_path)
 
-games_violate_list = []
+collection.initialize_results_table()
 
-games_not_solved_list = []
+# Resume after the last game whose result has been committed
+last_id = collection.last_result_id(args.run)
 
-for game in games:
-    id, puzzle, solution = game
+if last_id >= 0:
+    print(f"Resuming run '{args.run}' after game {last_id}.")
 
-    board = Board(puzzle, solution)
+while True:
+    games = collection.query_data(f"select id, puzzle, solution from sudoku where id > {last_id} order by id limit {args.batch_size}")
 
-    ai = SuDokuAI(board.puzzle)
+    if not games:
+        break
 
-    ai.infer_knowledge()
+    results = []
 
-    while not board.is_solved():
-        cell, value = ai.fill()
-        if cell == "No more cell to be inferred.":
-            break
-        elif not isinstance(cell, tuple):
-            break
-        try:
-            board.is_violating(cell, value)
-        except GameViolation:
-            print(f"Game {id}: Cell {cell} with value {value} violates the Game.")
-            games_violate_list.append(str(id))
-            break
-        else:
-            board.update(cell, value)
+    for game in games:
+        id, puzzle, solution = game
 
-    if board.is_solved():
-        games_solved += 1
-        print(f"Game {id} solved.")
-    else:
-        print(f"Game {id} cannot be solved.")
-        games_not_solved_list.append(str(id))
+        # A corrupt row is recorded, so that the run goes on and does not stop on it again when resumed
+        if not (is_well_formed(puzzle) and is_well_formed(solution)):
+            results.append((id, "malformed", 0, []))
+            continue
+
+        start = time.time()
+
+        board = Board(puzzle, solution)
+
+        ai = SuDokuAI(board.puzzle, time_budget=args.time_budget)
+
+        status = ai.infer_knowledge()
+
+        outcome = "budget exceeded" if status == BUDGET_EXCEEDED else "not solved"
+
+        while not board.is_solved():
+            cell, value = ai.fill()
+            if cell == "No more cell to be inferred.":
+                break
+            elif not isinstance(cell, tuple):
+                break
+            try:
+                board.is_violating(cell, value)
+            except GameViolation:
+                outcome = "violation"
+                break
+            else:
+                board.update(cell, value)
+
+        if board.is_solved():
+            outcome = "solved"
+
+        results.append((id, outcome, time.time() - start, ai.rating()['strategies_used']))
+
+    collection.store_results(args.run, results)
+
+    last_id = games[-1][0]
+
+    print(f"Committed the results up to game {last_id}.")
+
+print()
+
+games_solved, games_violate_list, games_not_solved_list, games_budget_exceeded_list, games_malformed_list = [collection.query_results(args.run, outcome) for outcome in ("solved", "violation", "not solved", "budget exceeded", "malformed")]
+
+total_games = len(games_solved) + len(games_violate_list) + len(games_not_solved_list) + len(games_budget_exceeded_list) + len(games_malformed_list)
+
+print(f"Succefully solved {len(games_solved)} out of {total_games} games.")
+
+print()
+
+print("Violation: ", ','.join(str(id) for id in games_violate_list))
 
 print()
 
-print(f"Succefully solved {games_solved} out of {total_games} games.")
+print("Not solved: ", ','.join(str(id) for id in games_not_solved_list))
 
 print()
 
-print("Violation: ", ','.join(games_violate_list))
+print("Budget exceeded: ", ','.join(str(id) for id in games_budget_exceeded_list))
 
 print()
 
-print("Not solved: ", ','.join(games_not_solved_list))
\ No newline at end of file
+print("Malformed: ", ','.join(str(id) for id in games_malformed_list))
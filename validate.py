@@ -0,0 +1,47 @@
+from sudoku import *
+from multiprocessing import Pool
+from functools import partial
+import argparse, csv
+
+parser = argparse.ArgumentParser(description="Find the puzzles in the database which are malformed or do not have exactly one solution.")
+parser.add_argument("--source-data-path", default="~/sudoku.csv", help="path of the source data, the database sits in the same folder")
+parser.add_argument("--output", default="invalid_puzzles.csv", help="csv file listing the id and the number of solutions (or 'malformed') of each invalid puzzle")
+parser.add_argument("--limit", type=int, default=2, help="stop counting the solutions of a puzzle at this number")
+parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+parser.add_argument("--batch-size", type=int, default=10000, help="number of puzzles queried at once")
+
+
+def count(limit, row):
+    id, puzzle = row
+    solutions = count_puzzle_solutions(puzzle, limit)
+    return id, "malformed" if solutions is None else solutions
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    collection = SuDokuCollection(source_data_path=args.source_data_path)
+
+    last_id = -1
+
+    puzzles_checked = 0
+
+    invalid_puzzles = 0
+
+    with Pool(args.processes) as pool, open(args.output, "w", newline="") as output:
+        writer = csv.writer(output)
+        writer.writerow(["id", "solutions"])
+        while True:
+            rows = collection.query_data(f"select id, puzzle from sudoku where id > {last_id} order by id limit {args.batch_size}")
+            if not rows:
+                break
+            invalid = [(id, solutions) for id, solutions in pool.map(partial(count, args.limit), rows, chunksize=100) if solutions != 1]
+            writer.writerows(invalid)
+            last_id = rows[-1][0]
+            puzzles_checked += len(rows)
+            invalid_puzzles += len(invalid)
+            print(f"Checked {puzzles_checked} puzzles, {invalid_puzzles} invalid.")
+
+    print()
+
+    print(f"{invalid_puzzles} out of {puzzles_checked} puzzles are malformed or do not have exactly one solution, see {args.output}.")